@@ -1,123 +1,202 @@
-import fitz  # PyMuPDF
 from docx import Document
-from docx.shared import Inches, Pt, RGBColor
+from docx.shared import Inches, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.enum.table import WD_TABLE_ALIGNMENT
+from docx.oxml import OxmlElement
+from lxml import etree
+from multiprocessing import Pool
+from functools import partial
+from operator import itemgetter
+import copy
 import os
+import numpy as np
 import pandas as pd
+from converter_common import (
+    STYLE_FLAGS, TEXT_ONLY_DICT_FLAGS, W_P, W_R, W_BR, W_TYPE, append_run_text, append_to_body,
+    build_rpr, build_table_xml, extract_worker_page, open_pdf, open_worker_document, save_docx,
+)
 
 
-def pdf_to_word_advanced(pdf_path, output_path):
+# Pages between progress callbacks
+PROGRESS_INTERVAL = 16
+
+# Max horizontal distance (points) between fragment starts in one column
+COLUMN_TOLERANCE = 5.0
+
+# Pristine document cloned for every conversion; looking up the table style
+# up front makes sure the styles part is already parsed in the template.
+_TEMPLATE_DOC = Document()
+_TEMPLATE_DOC.styles['Table Grid']
+
+
+def pdf_to_word_advanced(pdf_source, output_path, workers=None, progress_cb=None):
     """
     Advanced PDF to Word converter with better table and layout detection
+
+    pdf_source may be a path, the PDF bytes or a binary file object, and
+    output_path a path or a writable binary file object. Page extraction
+    runs in a process pool; the Word document is assembled sequentially in
+    this process from the returned payloads. progress_cb, if given, is
+    called as progress_cb(pages_done, page_count) every PROGRESS_INTERVAL
+    pages and once more at the end.
     """
-    pdf_document = fitz.open(pdf_path)
-    doc = Document()
+    if workers is None:
+        workers = min(os.cpu_count() or 1, 4)
+    
+    # Workers receive the raw bytes rather than an unpicklable stream
+    if hasattr(pdf_source, "read"):
+        pdf_source = pdf_source.read()
     
-    for page_num in range(pdf_document.page_count):
-        page = pdf_document[page_num]
+    doc = copy.deepcopy(_TEMPLATE_DOC)
+    
+    with open_pdf(pdf_source) as pdf_document:
+        page_count = pdf_document.page_count
         
-        if page_num > 0:
-            doc.add_page_break()
+        if workers > 1 and page_count > 1:
+            with Pool(workers, initializer=open_worker_document, initargs=(pdf_source,)) as pool:
+                payloads = pool.imap(partial(extract_worker_page, _extract_page_payload), range(page_count), chunksize=4)
+                for page_num, payload in enumerate(payloads):
+                    add_page_payload(doc, page_num, payload)
+                    _report_progress(progress_cb, page_num + 1, page_count)
+        else:
+            for page_num in range(page_count):
+                add_page_payload(doc, page_num, _extract_page_payload(pdf_document[page_num]))
+                _report_progress(progress_cb, page_num + 1, page_count)
+    
+    save_docx(doc, output_path)
+    if isinstance(output_path, (str, os.PathLike)):
+        print(f"Advanced conversion completed: {output_path}")
+
+
+def _report_progress(progress_cb, pages_done, page_count):
+    """
+    Forward progress every PROGRESS_INTERVAL pages and on the last page
+    """
+    if progress_cb and (pages_done % PROGRESS_INTERVAL == 0 or pages_done == page_count):
+        progress_cb(pages_done, page_count)
+
+
+def _extract_page_payload(page):
+    """
+    Extract a single page into picklable lists and dicts
+
+    find_tables() and get_text("dict") run exactly once per page and the
+    results are shared by both the table and the text-analysis paths.
+    """
+    try:
+        tables = page.find_tables().tables
+        # Image blocks never reach the Word output, so skip their bytes
+        blocks = page.get_text("dict", flags=TEXT_ONLY_DICT_FLAGS)["blocks"]
         
-        print(f"Processing page {page_num + 1}...")
+        # Sort blocks by position (top edge, then left edge) in place
+        blocks.sort(key=lambda b: (b["bbox"][1], b["bbox"][0]))
         
-        # Method 1: Try PyMuPDF table detection
-        tables_found = False
-        try:
-            tables = page.find_tables()
-            if tables:
-                tables_found = True
-                print(f"Found {len(tables)} tables using PyMuPDF")
-                process_page_with_tables(doc, page, tables)
-            else:
-                # Method 2: Use text analysis for table detection
-                detect_tables_from_text(doc, page)
-        except Exception as e:
-            print(f"Table detection failed: {e}")
-            # Fallback to basic text extraction
-            extract_text_basic(doc, page)
-    
-    doc.save(output_path)
-    pdf_document.close()
-    print(f"Advanced conversion completed: {output_path}")
-
-
-def process_page_with_tables(doc, page, tables):
+        return {
+            "sorted_blocks": blocks,
+            "table_cells": [table.extract() for table in tables],
+            "table_bboxes": [tuple(table.bbox) for table in tables],
+        }
+    except Exception as e:
+        # Text block tuples: (x0, y0, x1, y1, text, block_no, block_type)
+        text_blocks = [block[4] for block in page.get_text("blocks") if block[6] == 0]
+        return {"error": str(e), "text_blocks": text_blocks}
+
+
+def add_page_payload(doc, page_num, payload):
     """
-    Process page with detected tables
+    Add one extracted page to the Word document
     """
-    # Get all text blocks
-    blocks = page.get_text("dict")
-    table_areas = [table.bbox for table in tables]
-    
-    # Sort blocks by position
-    sorted_blocks = sorted(blocks["blocks"], key=lambda b: (b.get("bbox", [0, 0, 0, 0])[1], b.get("bbox", [0, 0, 0, 0])[0]))
+    if page_num > 0:
+        _append_page_break(doc.element.body)
     
+    if "error" in payload:
+        print(f"Table detection failed: {payload['error']}")
+        # Fallback to basic text extraction
+        extract_text_basic(doc, payload["text_blocks"])
+    elif payload["table_cells"]:
+        # Method 1: PyMuPDF table detection
+        process_page_with_tables(doc, payload["sorted_blocks"], payload["table_cells"], payload["table_bboxes"])
+    else:
+        # Method 2: Use text analysis for table detection
+        detect_tables_from_text(doc, payload["sorted_blocks"])
+
+
+def process_page_with_tables(doc, sorted_blocks, table_cells, table_areas):
+    """
+    Process page with detected tables
+    """
+    # Table areas as (x0, y0, x1, y1) tuples ordered by top edge, swept
+    # alongside the y-sorted blocks
+    pending_areas = sorted(map(tuple, table_areas), key=itemgetter(1))
+    active_areas = []
+    area_index = 0
     table_index = 0
     
     for block in sorted_blocks:
         # Check if we should insert a table here
-        if table_index < len(tables):
+        if table_index < len(table_cells):
             block_y = block.get("bbox", [0, 0, 0, 0])[1]
-            table_y = tables[table_index].bbox[1]
+            table_y = table_areas[table_index][1]
             
             if block_y > table_y:
                 # Insert table before this block
-                create_advanced_table(doc, tables[table_index])
+                create_advanced_table(doc, table_cells[table_index])
                 table_index += 1
         
+        in_table_area = False
+        if "bbox" in block:
+            bx0, by0, bx1, by1 = block["bbox"]
+            
+            # Start tracking tables whose top edge is above the block's bottom
+            while area_index < len(pending_areas) and pending_areas[area_index][1] < by1:
+                active_areas.append(pending_areas[area_index])
+                area_index += 1
+            
+            # Blocks arrive top-down, so tables ending above this one are done for good
+            if active_areas:
+                active_areas = [area for area in active_areas if area[3] > by0]
+            
+            for ax0, ay0, ax1, ay1 in active_areas:
+                if bx0 < ax1 and bx1 > ax0 and ay0 < by1:
+                    in_table_area = True
+                    break
+        
         # Process text block if not in table area
-        if not is_in_any_table_area(block, table_areas):
+        if not in_table_area:
             process_text_block_advanced(doc, block)
     
     # Insert remaining tables
-    while table_index < len(tables):
-        create_advanced_table(doc, tables[table_index])
+    while table_index < len(table_cells):
+        create_advanced_table(doc, table_cells[table_index])
         table_index += 1
 
 
-def create_advanced_table(doc, table):
+def create_advanced_table(doc, table_data):
     """
     Create a well-formatted table in Word
     """
     try:
-        table_data = table.extract()
         if not table_data or not table_data[0]:
             return
         
-        # Filter out empty rows and columns
-        filtered_data = []
+        # Stringify and strip every cell once, dropping empty rows and
+        # tracking the widest row in the same pass
+        stripped_rows = []
+        max_cols = 0
         for row in table_data:
-            if any(cell and str(cell).strip() for cell in row):
-                filtered_data.append(row)
+            cells = [str(cell).strip() if cell else "" for cell in row]
+            if any(cells):
+                stripped_rows.append(cells)
+                if len(cells) > max_cols:
+                    max_cols = len(cells)
         
-        if not filtered_data:
+        if not stripped_rows:
             return
         
-        # Determine number of columns
-        max_cols = max(len(row) for row in filtered_data)
+        # Pad every row out to the widest one
+        rows = [cells + [""] * (max_cols - len(cells)) for cells in stripped_rows]
         
-        # Create Word table
-        word_table = doc.add_table(rows=len(filtered_data), cols=max_cols)
-        word_table.style = 'Table Grid'
-        word_table.alignment = WD_TABLE_ALIGNMENT.LEFT
-        
-        # Fill table data
-        for row_idx, row in enumerate(filtered_data):
-            for col_idx in range(max_cols):
-                cell_text = ""
-                if col_idx < len(row) and row[col_idx]:
-                    cell_text = str(row[col_idx]).strip()
-                
-                cell = word_table.cell(row_idx, col_idx)
-                cell.text = cell_text
-                
-                # Format first row as header
-                if row_idx == 0 and cell_text:
-                    for paragraph in cell.paragraphs:
-                        for run in paragraph.runs:
-                            run.font.bold = True
+        # Create Word table, first row formatted as header
+        append_to_body(doc.element.body, build_table_xml(doc, rows, max_cols, bold_header=True, alignment="left"))
         
         # Add spacing
         doc.add_paragraph("")
@@ -126,88 +205,139 @@ def create_advanced_table(doc, table):
         print(f"Error creating table: {e}")
 
 
-def detect_tables_from_text(doc, page):
+def detect_tables_from_text(doc, blocks):
     """
     Detect tables by analyzing text positioning and alignment
     """
-    blocks = page.get_text("dict")
-    
-    # Group text by lines and analyze spacing
+    # Group text by lines as (bbox, text) pairs; PyMuPDF already reports
+    # the line bbox as the union of its spans
     lines_data = []
     
-    for block in blocks["blocks"]:
+    for block in blocks:
         if "lines" not in block:
             continue
             
         for line in block["lines"]:
-            line_text = ""
-            line_bbox = None
-            
-            for span in line["spans"]:
-                line_text += span["text"]
-                if line_bbox is None:
-                    line_bbox = span["bbox"]
-                else:
-                    # Extend bbox
-                    line_bbox = [
-                        min(line_bbox[0], span["bbox"][0]),
-                        min(line_bbox[1], span["bbox"][1]),
-                        max(line_bbox[2], span["bbox"][2]),
-                        max(line_bbox[3], span["bbox"][3])
-                    ]
+            line_text = "".join(span["text"] for span in line["spans"])
             
             if line_text.strip():
-                lines_data.append({
-                    'text': line_text,
-                    'bbox': line_bbox,
-                    'y': line_bbox[1] if line_bbox else 0
-                })
+                lines_data.append((line["bbox"], line_text))
     
     # Sort by y position
-    lines_data.sort(key=lambda x: x['y'])
+    lines_data.sort(key=lambda line: line[0][1])
+    
+    if not may_contain_table(lines_data):
+        # No tables possible, process as regular text without building rows
+        for _, text in lines_data:
+            p = doc.add_paragraph(text)
+        return
+    
+    # Cells placed apart on one baseline come out as separate lines
+    rows_data = group_row_fragments(lines_data)
     
     # Detect potential table areas
-    potential_tables = detect_table_patterns(lines_data)
+    potential_tables = detect_table_patterns(rows_data)
     
-    if potential_tables:
-        for table_lines in potential_tables:
-            create_table_from_lines(doc, table_lines)
-    else:
-        # No tables detected, process as regular text
-        for line_data in lines_data:
-            p = doc.add_paragraph(line_data['text'])
+    # Tables go where their first row was; every other row is regular text
+    tables_by_first_row = {id(table_lines[0]): table_lines for table_lines in potential_tables}
+    table_rows = {id(row_data) for table_lines in potential_tables for row_data in table_lines}
+    
+    for row_data in rows_data:
+        if id(row_data) in tables_by_first_row:
+            create_table_from_lines(doc, tables_by_first_row[id(row_data)])
+        elif id(row_data) not in table_rows:
+            for _, text in row_data['cells']:
+                p = doc.add_paragraph(text)
+
+
+def may_contain_table(lines_data):
+    """
+    Cheap check whether detect_table_patterns could find a table
+
+    A table needs two consecutive rows of at least two fragments each. Rows
+    are tracked the way group_row_fragments builds them, without keeping
+    their cells.
+    """
+    row_bbox = None
+    row_fragments = 0
+    previous_multi = False
+    
+    for bbox, _ in lines_data:
+        if row_bbox and row_bbox[1] <= (bbox[1] + bbox[3]) / 2 <= row_bbox[3]:
+            row_fragments += 1
+            if row_fragments == 2 and previous_multi:
+                return True
+        else:
+            previous_multi = row_fragments >= 2
+            row_bbox = bbox
+            row_fragments = 1
+    
+    return False
 
 
-def detect_table_patterns(lines_data):
+def group_row_fragments(lines_data):
     """
-    Analyze text patterns to detect tables
+    Merge y-sorted (bbox, text) lines that share a baseline into candidate
+    table rows
+
+    A line joins the current row when its vertical midpoint falls inside the
+    row's first line. Each row keeps its fragments as (x0, text) cells from
+    left to right.
+    """
+    rows_data = []
+    
+    for (x0, y0, x1, y1), text in lines_data:
+        if rows_data and rows_data[-1]['y'] <= (y0 + y1) / 2 <= rows_data[-1]['y1']:
+            rows_data[-1]['cells'].append((x0, text))
+        else:
+            rows_data.append({'y': y0, 'y1': y1, 'cells': [(x0, text)]})
+    
+    for row_data in rows_data:
+        if len(row_data['cells']) > 1:
+            row_data['cells'].sort(key=itemgetter(0))
+    
+    return rows_data
+
+
+def detect_table_patterns(rows_data):
+    """
+    Analyze row layout to detect tables
+
+    A table is a run of at least two consecutive rows with two or more
+    fragments each, whose fragments line up in at least two columns shared
+    by more than one row.
     """
     table_lines = []
     current_table = []
     
-    for i, line in enumerate(lines_data):
-        text = line['text']
+    for row_data in rows_data + [None]:
+        if row_data is not None and len(row_data['cells']) > 1:
+            current_table.append(row_data)
+            continue
         
-        # Check if line looks like table content
-        # Criteria: multiple spaces, tabs, or consistent column patterns
-        if (text.count('  ') >= 2 or  # Multiple double spaces
-            text.count('\t') >= 1 or   # Contains tabs
-            len([x for x in text.split() if x]) >= 3):  # Multiple words
-            
-            current_table.append(line)
-        else:
-            # End of potential table
-            if len(current_table) >= 2:  # Minimum 2 rows for a table
-                table_lines.append(current_table)
-            current_table = []
-    
-    # Check last table
-    if len(current_table) >= 2:
-        table_lines.append(current_table)
+        # End of potential table
+        if len(current_table) >= 2 and has_aligned_columns(current_table):
+            table_lines.append(current_table)
+        current_table = []
     
     return table_lines
 
 
+def has_aligned_columns(table_lines):
+    """
+    Check that the rows' fragments cluster into two or more columns that
+    each hold fragments from at least two rows
+    """
+    xs = np.fromiter((x0 for line in table_lines for x0, _ in line['cells']), dtype=np.float32)
+    row_ids = (row_id for row_id, line in enumerate(table_lines) for _ in line['cells'])
+    
+    column_rows = {}
+    for column_id, row_id in zip(cluster_columns(xs).tolist(), row_ids):
+        column_rows.setdefault(column_id, set()).add(row_id)
+    
+    return sum(len(rows) >= 2 for rows in column_rows.values()) >= 2
+
+
 def create_table_from_lines(doc, table_lines):
     """
     Create table from detected text lines
@@ -216,28 +346,22 @@ def create_table_from_lines(doc, table_lines):
         # Parse each line into columns
         table_data = []
         
-        for line in table_lines:
-            text = line['text']
-            # Split by multiple spaces or tabs
-            columns = [col.strip() for col in text.replace('\t', '  ').split('  ') if col.strip()]
-            if columns:
-                table_data.append(columns)
-        
-        if not table_data:
-            return
+        # Align the positioned fragments on shared column starts
+        xs = np.fromiter((x0 for line in table_lines for x0, _ in line['cells']), dtype=np.float32)
+        column_ids = cluster_columns(xs).tolist()
+        num_columns = max(column_ids) + 1
         
-        # Determine max columns
-        max_cols = max(len(row) for row in table_data)
+        span_index = 0
+        for line in table_lines:
+            columns = [""] * num_columns
+            for _, text in line['cells']:
+                col_idx = column_ids[span_index]
+                columns[col_idx] = f"{columns[col_idx]} {text.strip()}".strip()
+                span_index += 1
+            table_data.append(columns)
         
         # Create Word table
-        word_table = doc.add_table(rows=len(table_data), cols=max_cols)
-        word_table.style = 'Table Grid'
-        
-        # Fill data
-        for row_idx, row in enumerate(table_data):
-            for col_idx in range(max_cols):
-                cell_text = row[col_idx] if col_idx < len(row) else ""
-                word_table.cell(row_idx, col_idx).text = cell_text
+        append_to_body(doc.element.body, build_table_xml(doc, table_data, num_columns, alignment="left"))
         
         doc.add_paragraph("")
         
@@ -245,62 +369,80 @@ def create_table_from_lines(doc, table_lines):
         print(f"Error creating table from lines: {e}")
 
 
+def cluster_columns(xs, tol=COLUMN_TOLERANCE):
+    """
+    Assign a column id to every fragment x-position
+
+    Positions are sorted once and a new column starts wherever the gap to
+    the previous position exceeds `tol`, so ids run left to right.
+    """
+    order = np.argsort(xs, kind="stable")
+    column_starts = np.diff(xs[order]) > tol
+    
+    column_ids = np.empty(len(xs), dtype=np.int32)
+    column_ids[order] = np.concatenate(([0], np.cumsum(column_starts)))
+    return column_ids
+
+
 def process_text_block_advanced(doc, block):
     """
     Advanced text processing with better formatting
+
+    Each line's <w:p> is built directly with lxml and inserted into the body
+    once, skipping python-docx's Paragraph/Run wrappers in this hot path.
     """
     lines = block.get("lines", [])
     if not lines:
         return
     
+    body = doc.element.body
+    
     for line in lines:
-        paragraph = doc.add_paragraph()
+        paragraph = OxmlElement("w:p")
         
         for span in line["spans"]:
             text = span["text"]
             if text.strip():
-                run = paragraph.add_run(text)
+                run = etree.SubElement(paragraph, W_R)
                 
-                # Apply formatting
-                font = run.font
-                font.name = span.get("font", "Arial")
-                font.size = Pt(span.get("size", 12))
+                # Apply formatting from a shared rPr template
+                run.append(copy.deepcopy(build_rpr(span["font"], span["size"], span["flags"] & STYLE_FLAGS)))
                 
-                # Handle font flags
-                flags = span.get("flags", 0)
-                if flags & 2**4:  # Bold
-                    font.bold = True
-                if flags & 2**1:  # Italic
-                    font.italic = True
-                if flags & 2**2:  # Underline
-                    font.underline = True
+                append_run_text(run, text)
+        
+        append_to_body(body, paragraph)
 
 
-def is_in_any_table_area(block, table_areas):
+def _append_page_break(body):
     """
-    Check if block is within any table area
+    End the current page, reusing the last paragraph when there is one
+
+    The break goes into a new run of the previous paragraph; only a table
+    or an empty body gets a paragraph of its own, as add_page_break() does.
     """
-    if not table_areas or "bbox" not in block:
-        return False
-    
-    block_bbox = block["bbox"]
+    sect_pr = body.sectPr
+    last = body[-1] if sect_pr is None else sect_pr.getprevious()
     
-    for table_bbox in table_areas:
-        if (block_bbox[0] < table_bbox[2] and block_bbox[2] > table_bbox[0] and
-            block_bbox[1] < table_bbox[3] and block_bbox[3] > table_bbox[1]):
-            return True
+    if last is None or last.tag != W_P:
+        last = OxmlElement("w:p")
+        append_to_body(body, last)
     
-    return False
+    etree.SubElement(etree.SubElement(last, W_R), W_BR, {W_TYPE: "page"})
 
 
-def extract_text_basic(doc, page):
+def extract_text_basic(doc, text_blocks):
     """
-    Basic text extraction fallback
+    Basic text extraction fallback, one paragraph per PDF text block
     """
-    text = page.get_text()
-    for line in text.split('\n'):
-        if line.strip():
-            doc.add_paragraph(line)
+    body = doc.element.body
+    
+    for text in text_blocks:
+        text = text.strip()
+        if text:
+            paragraph = OxmlElement("w:p")
+            # Lines inside the block become line breaks
+            append_run_text(etree.SubElement(paragraph, W_R), text)
+            append_to_body(body, paragraph)
 
 
 def main():
@@ -315,7 +457,10 @@ def main():
     output_path = f"{base_name}_advanced_converted.docx"
     
     try:
-        pdf_to_word_advanced(pdf_path, output_path)
+        pdf_to_word_advanced(
+            pdf_path, output_path,
+            progress_cb=lambda done, total: print(f"Processed {done}/{total} pages...")
+        )
     except Exception as e:
         print(f"Error during conversion: {e}")
 
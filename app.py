@@ -4,14 +4,18 @@ PDF to Word Converter - Streamlit Web Application
 
 import streamlit as st
 import os
-import tempfile
 from pathlib import Path
 import time
 from datetime import datetime
-from comprehensive_pdf_converter import ComprehensivePDFConverter
-import base64
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+from comprehensive_pdf_converter import convert_pdf_bytes, limit_ocr_concurrency
 import io
 
+# Number of conversions kept in the session history
+MAX_HISTORY = 100
+
 # Page configuration
 st.set_page_config(
     page_title="PDF to Word Converter",
@@ -58,16 +62,7 @@ st.markdown("""
 
 # Initialize session state
 if 'conversion_history' not in st.session_state:
-    st.session_state.conversion_history = []
-if 'converter' not in st.session_state:
-    st.session_state.converter = ComprehensivePDFConverter()
-
-def get_download_link(file_path, file_name):
-    """Generate download link for file"""
-    with open(file_path, 'rb') as f:
-        data = f.read()
-    b64 = base64.b64encode(data).decode()
-    return f'<a href="data:application/vnd.openxmlformats-officedocument.wordprocessingml.document;base64,{b64}" download="{file_name}">Download {file_name}</a>'
+    st.session_state.conversion_history = deque(maxlen=MAX_HISTORY)
 
 def format_file_size(size_bytes):
     """Format file size in human readable format"""
@@ -166,53 +161,40 @@ with tab1:
                     progress_bar = progress_container.progress(0)
                     status_container.info("🔄 Starting conversion...")
                     
-                    # Save uploaded file temporarily
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                        tmp_pdf.write(uploaded_file.getvalue())
-                        tmp_pdf_path = tmp_pdf.name
-                    
                     # Update progress
                     progress_bar.progress(25)
                     status_container.info(f"📊 Using {method} method...")
                     
-                    # Generate output path
                     output_filename = f"{Path(uploaded_file.name).stem}_converted.docx"
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp_docx:
-                        output_path = tmp_docx.name
                     
-                    # Convert
+                    # Convert straight from the uploaded bytes
                     progress_bar.progress(50)
                     status_container.info("🔧 Converting document...")
                     
                     start_time = time.time()
-                    success = st.session_state.converter.convert(
-                        tmp_pdf_path, 
-                        output_path, 
-                        method=method
-                    )
+                    docx_bytes = convert_pdf_bytes(uploaded_file.getvalue(), method)
                     conversion_time = time.time() - start_time
                     
                     progress_bar.progress(100)
                     
-                    if success:
+                    if docx_bytes is not None:
                         # Success message
                         status_container.empty()
                         st.markdown(f"""
                         <div class="success-box">
                         ✅ <b>Conversion Successful!</b><br>
                         ⏱️ Time taken: {conversion_time:.2f} seconds<br>
-                        📊 Output size: {format_file_size(os.path.getsize(output_path))}
+                        📊 Output size: {format_file_size(len(docx_bytes))}
                         </div>
                         """, unsafe_allow_html=True)
                         
                         # Download button
-                        with open(output_path, 'rb') as f:
-                            st.download_button(
-                                label="📥 Download Converted File",
-                                data=f.read(),
-                                file_name=output_filename,
-                                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                            )
+                        st.download_button(
+                            label="📥 Download Converted File",
+                            data=docx_bytes,
+                            file_name=output_filename,
+                            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+                        )
                         
                         # Add to history
                         st.session_state.conversion_history.append({
@@ -222,7 +204,7 @@ with tab1:
                             'duration': conversion_time,
                             'success': True,
                             'size_in': uploaded_file.size,
-                            'size_out': os.path.getsize(output_path)
+                            'size_out': len(docx_bytes)
                         })
                         
                     else:
@@ -247,8 +229,6 @@ with tab1:
                     
                     # Clean up
                     progress_container.empty()
-                    if os.path.exists(tmp_pdf_path):
-                        os.unlink(tmp_pdf_path)
                     
                 except Exception as e:
                     status_container.empty()
@@ -298,54 +278,50 @@ with tab2:
             
             total_files = len(uploaded_files)
             successful_conversions = 0
+            progress_container.progress(0.0, f"Converting {total_files} files...")
             
-            for i, uploaded_file in enumerate(uploaded_files):
-                progress = (i / total_files)
-                progress_container.progress(progress, f"Converting {i+1}/{total_files}: {uploaded_file.name}")
+            # Streamlit's server is multi-threaded, so start workers with spawn rather than fork;
+            # each worker's OCR threads get an equal share of the CPUs
+            workers = min(os.cpu_count() or 1, 4)
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=limit_ocr_concurrency,
+                initargs=(workers,)
+            ) as executor:
+                futures = {
+                    executor.submit(convert_pdf_bytes, uploaded_file.getvalue(), method): (i, uploaded_file)
+                    for i, uploaded_file in enumerate(uploaded_files)
+                }
                 
-                try:
-                    # Save uploaded file
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                        tmp_pdf.write(uploaded_file.getvalue())
-                        tmp_pdf_path = tmp_pdf.name
+                for completed, future in enumerate(as_completed(futures), start=1):
+                    i, uploaded_file = futures[future]
+                    progress_container.progress(completed / total_files, f"Converted {completed}/{total_files}: {uploaded_file.name}")
                     
-                    # Generate output path
-                    output_filename = f"{Path(uploaded_file.name).stem}_converted.docx"
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp_docx:
-                        output_path = tmp_docx.name
-                    
-                    # Convert
-                    success = st.session_state.converter.convert(
-                        tmp_pdf_path,
-                        output_path,
-                        method=method
-                    )
-                    
-                    if success:
-                        successful_conversions += 1
-                        with results_container:
-                            st.success(f"✅ {uploaded_file.name} converted successfully")
-                            
-                            # Provide download link
-                            with open(output_path, 'rb') as f:
+                    try:
+                        docx_bytes = future.result()
+                        
+                        if docx_bytes is not None:
+                            successful_conversions += 1
+                            output_filename = f"{Path(uploaded_file.name).stem}_converted.docx"
+                            with results_container:
+                                st.success(f"✅ {uploaded_file.name} converted successfully")
+                                
+                                # Provide download link
                                 st.download_button(
                                     label=f"Download {output_filename}",
-                                    data=f.read(),
+                                    data=docx_bytes,
                                     file_name=output_filename,
                                     mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
                                     key=f"download_{i}"
                                 )
-                    else:
+                        else:
+                            with results_container:
+                                st.error(f"❌ {uploaded_file.name} conversion failed")
+                            
+                    except Exception as e:
                         with results_container:
-                            st.error(f"❌ {uploaded_file.name} conversion failed")
-                    
-                    # Cleanup
-                    if os.path.exists(tmp_pdf_path):
-                        os.unlink(tmp_pdf_path)
-                        
-                except Exception as e:
-                    with results_container:
-                        st.error(f"❌ {uploaded_file.name}: {str(e)}")
+                            st.error(f"❌ {uploaded_file.name}: {str(e)}")
             
             progress_container.progress(1.0, f"Completed! {successful_conversions}/{total_files} successful")
 
@@ -356,7 +332,7 @@ with tab3:
     if st.session_state.conversion_history:
         # Clear history button
         if st.button("🗑️ Clear History"):
-            st.session_state.conversion_history = []
+            st.session_state.conversion_history.clear()
             st.rerun()
         
         # Display history table
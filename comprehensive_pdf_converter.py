@@ -6,24 +6,43 @@ Handles all PDF types with visual formatting preservation
 import os
 import sys
 import fitz  # PyMuPDF
-import pdfplumber
-from pdf2docx import Converter
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.table import WD_TABLE_ALIGNMENT
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
-import pytesseract
 from PIL import Image
 import numpy as np
-import cv2
+import copy
 import io
 import tempfile
 import shutil
-from typing import Dict, List, Tuple, Optional, Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import BinaryIO, Dict, List, Tuple, Optional, Any, Union
 import logging
 from pathlib import Path
+from converter_common import open_pdf
+
+# Image formats python-docx can embed as extracted from the PDF
+WORD_IMAGE_FORMATS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tif', 'tiff'}
+
+# pdfplumber table settings for the table fallback, spelled out so the
+# strategy stays ruling-line based whatever pdfplumber's defaults become
+PLUMBER_TABLE_SETTINGS = {
+    "vertical_strategy": "lines",
+    "horizontal_strategy": "lines",
+    "snap_tolerance": 3,
+    "join_tolerance": 3,
+}
+
+# Rendered pages allowed to queue for OCR beyond the running workers
+OCR_RENDER_AHEAD = 4
+
+# pdf2docx, pdfplumber and pytesseract are imported inside the methods that
+# use them, keeping module import (and pool worker start-up) light.
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -35,60 +54,86 @@ class ComprehensivePDFConverter:
     Main converter class that orchestrates multiple conversion strategies
     """
     
-    def __init__(self):
-        self.temp_dir = tempfile.mkdtemp()
+    def __init__(self, enhance_tables: bool = False):
+        # Run the pdfplumber table pass over hybrid output; it only reports
+        # what it finds, so it is off by default
+        self.enhance_tables = enhance_tables
+        # Scratch directory of the conversion in progress, set by convert()
+        self.temp_dir: Optional[str] = None
+        # PyMuPDF document shared by every step of the conversion in progress
+        self.pdf_doc: Optional[fitz.Document] = None
+        # Extracted image (bytes, ext, width, height) per xref of that document,
+        # so an image placed on many pages is only extracted once
+        self._image_cache: Dict[int, Tuple[bytes, str, int, int]] = {}
         self.conversion_methods = {
             'pdf2docx': self._convert_with_pdf2docx,
             'pymupdf': self._convert_with_pymupdf,
             'pdfplumber': self._convert_with_pdfplumber,
             'hybrid': self._convert_hybrid
         }
+        # RGBColor per PyMuPDF color int; RGBColor is immutable, so runs share them
+        self._rgb_cache: Dict[int, RGBColor] = {}
+        # Pt lengths per font size; like RGBColor, Pt is an immutable int
+        self._pt_cache: Dict[float, Pt] = {}
     
-    def convert(self, pdf_path: str, output_path: str, method: str = 'hybrid') -> bool:
+    def convert(self, pdf_path: Union[str, bytes], output_path: Union[str, BinaryIO],
+                method: str = 'hybrid') -> bool:
         """
         Convert PDF to Word using specified method
+
+        Scratch files live in a temporary directory created for this call,
+        so one converter can be reused for any number of conversions. The
+        PDF is opened with PyMuPDF once and shared as self.pdf_doc.
+
+        pdf_path may also be the PDF's bytes and output_path a binary file
+        object, except for the pdf2docx and hybrid methods: pdf2docx reads
+        and writes real files.
         """
         try:
-            logger.info(f"Starting conversion: {pdf_path} -> {output_path}")
-            logger.info(f"Using method: {method}")
-            
-            # Check if PDF is scanned
-            if self._is_scanned_pdf(pdf_path):
-                logger.info("Detected scanned PDF, using OCR")
-                return self._convert_scanned_pdf(pdf_path, output_path)
-            
-            # Use specified conversion method
-            if method in self.conversion_methods:
-                return self.conversion_methods[method](pdf_path, output_path)
-            else:
-                logger.error(f"Unknown method: {method}")
-                return False
+            with tempfile.TemporaryDirectory() as temp_dir, open_pdf(pdf_path) as pdf_doc:
+                self.temp_dir = temp_dir
+                self.pdf_doc = pdf_doc
+                
+                source = "<PDF bytes>" if isinstance(pdf_path, bytes) else pdf_path
+                logger.info(f"Starting conversion: {source} -> {output_path}")
+                logger.info(f"Using method: {method}")
+                
+                # Check if PDF is scanned
+                if self._is_scanned_pdf(pdf_doc):
+                    logger.info("Detected scanned PDF, using OCR")
+                    return self._convert_scanned_pdf(pdf_path, output_path)
+                
+                # Use specified conversion method
+                if method in self.conversion_methods:
+                    return self.conversion_methods[method](pdf_path, output_path)
+                else:
+                    logger.error(f"Unknown method: {method}")
+                    return False
                 
         except Exception as e:
             logger.error(f"Conversion failed: {str(e)}")
             return False
         finally:
-            # Cleanup
-            if os.path.exists(self.temp_dir):
-                shutil.rmtree(self.temp_dir)
+            self.temp_dir = None
+            self.pdf_doc = None
+            self._image_cache.clear()
     
-    def _is_scanned_pdf(self, pdf_path: str) -> bool:
+    def _is_scanned_pdf(self, pdf_doc: fitz.Document) -> bool:
         """
         Check if PDF is scanned (image-based)
+
+        Only needs a character count, so PyMuPDF's plain text extraction is
+        used rather than a pdfplumber layout pass.
         """
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                # Check first few pages
-                pages_to_check = min(3, len(pdf.pages))
-                text_found = False
-                
-                for i in range(pages_to_check):
-                    text = pdf.pages[i].extract_text()
-                    if text and len(text.strip()) > 50:
-                        text_found = True
-                        break
-                
-                return not text_found
+            # Check first few pages
+            pages_to_check = min(3, pdf_doc.page_count)
+            
+            for i in range(pages_to_check):
+                if len(pdf_doc[i].get_text("text").strip()) > 50:
+                    return False
+            
+            return True
         except:
             return False
     
@@ -96,6 +141,8 @@ class ComprehensivePDFConverter:
         """
         Direct conversion using pdf2docx library
         """
+        from pdf2docx import Converter
+        
         try:
             cv = Converter(pdf_path)
             cv.convert(output_path)
@@ -111,7 +158,7 @@ class ComprehensivePDFConverter:
         Conversion using PyMuPDF with enhanced formatting
         """
         try:
-            pdf_doc = fitz.open(pdf_path)
+            pdf_doc = self.pdf_doc
             word_doc = Document()
             
             for page_num, page in enumerate(pdf_doc):
@@ -122,7 +169,6 @@ class ComprehensivePDFConverter:
                 self._process_page_pymupdf(page, word_doc)
             
             word_doc.save(output_path)
-            pdf_doc.close()
             logger.info("PyMuPDF conversion completed")
             return True
         except Exception as e:
@@ -136,8 +182,8 @@ class ComprehensivePDFConverter:
         try:
             word_doc = Document()
             
-            with pdfplumber.open(pdf_path) as pdf:
-                for page_num, page in enumerate(pdf.pages):
+            with _open_plumber(pdf_path) as pdf:
+                for page_num, page in enumerate(self._iter_plumber_pages(pdf)):
                     if page_num > 0:
                         word_doc.add_page_break()
                     
@@ -150,16 +196,33 @@ class ComprehensivePDFConverter:
             logger.error(f"pdfplumber failed: {str(e)}")
             return False
     
+    def _iter_plumber_pages(self, plumber_pdf):
+        """
+        Yield pdfplumber pages, closing each one once the caller moves on
+
+        pdfplumber keeps every page's parsed objects cached on the PDF, so
+        without this memory grows with the whole document instead of
+        staying at about one page.
+        """
+        for page in plumber_pdf.pages:
+            try:
+                yield page
+            finally:
+                page.close()
+    
     def _convert_hybrid(self, pdf_path: str, output_path: str) -> bool:
         """
         Hybrid approach combining multiple methods
         """
         try:
             # First try pdf2docx for best formatting
-            temp_output = os.path.join(self.temp_dir, "temp_pdf2docx.docx")
-            if self._convert_with_pdf2docx(pdf_path, temp_output):
-                # Enhance with table detection from pdfplumber
-                self._enhance_with_tables(pdf_path, temp_output, output_path)
+            if self.enhance_tables:
+                temp_output = os.path.join(self.temp_dir, "temp_pdf2docx.docx")
+                if self._convert_with_pdf2docx(pdf_path, temp_output):
+                    # Enhance with table detection from pdfplumber
+                    self._enhance_with_tables(pdf_path, temp_output, output_path)
+                    return True
+            elif self._convert_with_pdf2docx(pdf_path, output_path):
                 return True
             
             # Fallback to custom implementation
@@ -173,9 +236,12 @@ class ComprehensivePDFConverter:
     def _custom_comprehensive_convert(self, pdf_path: str, output_path: str) -> bool:
         """
         Custom comprehensive conversion with all features
+
+        Text, images and tables all come from one PyMuPDF parse of each page;
+        pdfplumber is only opened if a page needs its table fallback.
         """
         try:
-            pdf_doc = fitz.open(pdf_path)
+            pdf_doc = self.pdf_doc
             word_doc = Document()
             
             # Set document margins
@@ -186,22 +252,35 @@ class ComprehensivePDFConverter:
                 section.left_margin = Inches(0.5)
                 section.right_margin = Inches(0.5)
             
-            with pdfplumber.open(pdf_path) as plumber_pdf:
-                for page_num in range(len(pdf_doc)):
+            plumber_pdf = None
+            plumber_page = None
+            
+            def get_plumber_page(page_num):
+                nonlocal plumber_pdf, plumber_page
+                if plumber_pdf is None:
+                    plumber_pdf = _open_plumber(pdf_path)
+                plumber_page = plumber_pdf.pages[page_num]
+                return plumber_page
+            
+            try:
+                for page_num, mupdf_page in enumerate(pdf_doc):
                     if page_num > 0:
                         word_doc.add_page_break()
                     
-                    # Get both representations
-                    mupdf_page = pdf_doc[page_num]
-                    plumber_page = plumber_pdf.pages[page_num]
-                    
                     # Process page with combined approach
                     self._process_page_comprehensive(
-                        mupdf_page, plumber_page, word_doc, page_num
+                        mupdf_page, lambda: get_plumber_page(page_num), word_doc, page_num
                     )
+                    
+                    # Release the pdfplumber page's cached objects, if it was used
+                    if plumber_page is not None:
+                        plumber_page.close()
+                        plumber_page = None
+            finally:
+                if plumber_pdf is not None:
+                    plumber_pdf.close()
             
             word_doc.save(output_path)
-            pdf_doc.close()
             logger.info("Custom comprehensive conversion completed")
             return True
             
@@ -209,14 +288,16 @@ class ComprehensivePDFConverter:
             logger.error(f"Custom conversion failed: {str(e)}")
             return False
     
-    def _process_page_comprehensive(self, mupdf_page, plumber_page, word_doc, page_num):
+    def _process_page_comprehensive(self, mupdf_page, get_plumber_page, word_doc, page_num):
         """
         Process a page using multiple extraction methods
+
+        get_plumber_page returns the matching pdfplumber page on demand.
         """
         logger.info(f"Processing page {page_num + 1}")
         
         # Extract tables first
-        tables = self._extract_tables_comprehensive(plumber_page)
+        tables = self._extract_tables_comprehensive(mupdf_page, get_plumber_page)
         table_regions = [table['bbox'] for table in tables]
         
         # Extract images
@@ -225,108 +306,91 @@ class ComprehensivePDFConverter:
         # Extract text with formatting
         blocks = mupdf_page.get_text("dict")
         
-        # Sort content by position
-        content_items = []
+        # Sort content by position; items are (y_pos, type, data) tuples
+        content_items = [(table['bbox'][1], 'table', table['data']) for table in tables]
+        content_items.extend((img['bbox'][1], 'image', img) for img in images)
         
-        # Add tables to content items
-        for table in tables:
-            content_items.append({
-                'type': 'table',
-                'data': table['data'],
-                'bbox': table['bbox'],
-                'y_pos': table['bbox'][1]
-            })
-        
-        # Add images to content items
-        for img in images:
-            content_items.append({
-                'type': 'image',
-                'data': img['data'],
-                'bbox': img['bbox'],
-                'y_pos': img['bbox'][1]
-            })
-        
-        # Add text blocks to content items
-        for block in blocks['blocks']:
-            if 'lines' in block:
-                # Check if block is inside a table region
-                if not self._is_in_regions(block.get('bbox', [0,0,0,0]), table_regions):
-                    content_items.append({
-                        'type': 'text',
-                        'data': block,
-                        'bbox': block.get('bbox', [0,0,0,0]),
-                        'y_pos': block.get('bbox', [0,0,0,0])[1]
-                    })
+        # Add text blocks to content items, skipping those inside a table region
+        text_blocks = [block for block in blocks['blocks'] if 'lines' in block]
+        in_tables = self._in_regions_mask(
+            [block.get('bbox', [0,0,0,0]) for block in text_blocks], table_regions
+        )
+        content_items.extend(
+            (block.get('bbox', [0,0,0,0])[1], 'text', block)
+            for block, in_table in zip(text_blocks, in_tables) if not in_table
+        )
         
-        # Sort by vertical position
-        content_items.sort(key=lambda x: x['y_pos'])
+        # Sort by vertical position only; the sort is stable for ties
+        content_items.sort(key=itemgetter(0))
         
         # Process sorted content
-        for item in content_items:
-            if item['type'] == 'table':
-                self._add_table_to_doc(word_doc, item['data'])
-            elif item['type'] == 'image':
-                self._add_image_to_doc(word_doc, item['data'])
-            elif item['type'] == 'text':
-                self._add_text_block_to_doc(word_doc, item['data'])
-    
-    def _extract_tables_comprehensive(self, plumber_page):
+        for item_idx, (_, item_type, data) in enumerate(content_items, 1):
+            if item_type == 'table':
+                # Text and images start with their own paragraph, so only
+                # another table or the page end needs a spacer
+                next_is_paragraph = (item_idx < len(content_items) and
+                                     content_items[item_idx][1] != 'table')
+                self._add_table_to_doc(word_doc, data, spacer=not next_is_paragraph)
+            elif item_type == 'image':
+                self._add_image_to_doc(word_doc, data)
+            elif item_type == 'text':
+                self._add_text_block_to_doc(word_doc, data)
+    
+    def _extract_tables_comprehensive(self, mupdf_page, get_plumber_page):
         """
         Extract tables using multiple methods
         """
         tables = []
         
-        # Method 1: pdfplumber table detection
-        plumber_tables = plumber_page.extract_tables()
-        for i, table in enumerate(plumber_tables):
-            if table and len(table) > 0:
-                # Get table bbox
-                table_bbox = self._estimate_table_bbox(plumber_page, table)
+        # Method 1: PyMuPDF table detection on the already parsed page
+        for table in mupdf_page.find_tables().tables:
+            table_data = table.extract()
+            if table_data:
                 tables.append({
-                    'data': table,
-                    'bbox': table_bbox
+                    'data': table_data,
+                    'bbox': list(table.bbox)
                 })
         
-        # Method 2: Custom table detection based on lines
+        if tables:
+            return tables
+        
+        # Method 2: pdfplumber table detection. The "lines" strategies only
+        # build tables from ruling edges, so pages without any skip it
+        plumber_page = get_plumber_page()
+        edges = plumber_page.edges
+        if edges:
+            for table in plumber_page.find_tables(PLUMBER_TABLE_SETTINGS):
+                table_data = table.extract()
+                if table_data:
+                    tables.append({
+                        'data': table_data,
+                        'bbox': list(table.bbox)
+                    })
+        
+        # Method 3: Custom table detection based on lines
         if not tables:
-            custom_tables = self._detect_tables_from_lines(plumber_page)
+            custom_tables = self._detect_tables_from_lines(edges)
             tables.extend(custom_tables)
         
         return tables
     
-    def _estimate_table_bbox(self, page, table_data):
-        """
-        Estimate bounding box for a table
-        """
-        # Simple estimation - can be improved
-        page_height = page.height
-        page_width = page.width
-        
-        # Rough estimation based on table position
-        rows = len(table_data)
-        cols = len(table_data[0]) if table_data else 0
-        
-        # Estimate based on page dimensions
-        y_start = 100  # Default top margin
-        y_end = y_start + (rows * 20)  # Rough row height
-        x_start = 50
-        x_end = page_width - 50
-        
-        return [x_start, y_start, x_end, y_end]
-    
-    def _detect_tables_from_lines(self, page):
+    def _detect_tables_from_lines(self, edges):
         """
-        Detect tables based on line patterns
+        Detect tables based on line patterns in a page's pdfplumber edges
         """
         tables = []
         
-        # Extract horizontal and vertical lines
-        h_lines = page.horizontal_edges
-        v_lines = page.vertical_edges
+        # Count horizontal and vertical lines in one pass
+        h_count = v_count = 0
+        for edge in edges:
+            if edge['orientation'] == 'h':
+                h_count += 1
+            else:
+                v_count += 1
         
         # Group lines to detect table regions
         # This is a simplified version - can be enhanced
-        if len(h_lines) > 2 and len(v_lines) > 2:
+        if h_count > 2 and v_count > 2:
             # Potential table detected
             logger.info("Detected potential table from lines")
         
@@ -337,64 +401,82 @@ class ComprehensivePDFConverter:
         Extract images from PDF page
         """
         images = []
-        image_list = page.get_images()
+        image_list = page.get_images(full=True)
         
         for img_index, img in enumerate(image_list):
             try:
-                # Extract image
                 xref = img[0]
-                pix = fitz.Pixmap(page.parent, xref)
-                
-                if pix.n - pix.alpha < 4:  # GRAY or RGB
-                    img_data = pix.tobytes()
-                else:  # Convert CMYK to RGB
-                    pix = fitz.Pixmap(fitz.csRGB, pix)
-                    img_data = pix.tobytes()
+                cached = self._image_cache.get(xref)
+                if cached is None:
+                    cached = self._image_cache[xref] = self._extract_image_xref(page.parent, xref)
+                img_data, ext, width, height = cached
                 
                 # Get image position
                 img_bbox = page.get_image_bbox(img)
                 
                 images.append({
                     'data': img_data,
+                    'ext': ext,
                     'bbox': list(img_bbox),
-                    'width': pix.width,
-                    'height': pix.height
+                    'width': width,
+                    'height': height
                 })
                 
-                pix = None
-                
             except Exception as e:
                 logger.warning(f"Failed to extract image: {str(e)}")
         
         return images
     
-    def _is_in_regions(self, bbox, regions):
+    def _extract_image_xref(self, pdf_doc, xref) -> Tuple[bytes, str, int, int]:
         """
-        Check if bbox is inside any of the regions
+        Return (bytes, ext, width, height) for an image xref in an embeddable format
         """
-        for region in regions:
-            if (bbox[0] >= region[0] and bbox[2] <= region[2] and
-                bbox[1] >= region[1] and bbox[3] <= region[3]):
-                return True
-        return False
+        # Pull the embedded image stream as stored, no decode/re-encode
+        img_info = pdf_doc.extract_image(xref)
+        img_data = img_info['image']
+        ext = img_info['ext']
+        
+        # Formats Word cannot embed (JPX, JBIG2, ...) go through a pixmap
+        if ext not in WORD_IMAGE_FORMATS:
+            pix = fitz.Pixmap(pdf_doc, xref)
+            if pix.n - pix.alpha >= 4:  # Convert CMYK to RGB
+                pix = fitz.Pixmap(fitz.csRGB, pix)
+            img_data = pix.tobytes("png")
+            ext = 'png'
+        
+        return img_data, ext, img_info['width'], img_info['height']
     
-    def _add_table_to_doc(self, doc, table_data):
+    def _in_regions_mask(self, bboxes, regions) -> np.ndarray:
+        """
+        For each bbox, whether it lies inside any of the regions
+
+        All bbox/region pairs are compared in one broadcast NumPy operation.
+        """
+        if not bboxes or not regions:
+            return np.zeros(len(bboxes), dtype=bool)
+        
+        boxes = np.asarray(bboxes, dtype=np.float64)[:, None, :]
+        areas = np.asarray(regions, dtype=np.float64)[None, :, :]
+        
+        inside = ((boxes[..., 0] >= areas[..., 0]) & (boxes[..., 2] <= areas[..., 2]) &
+                  (boxes[..., 1] >= areas[..., 1]) & (boxes[..., 3] <= areas[..., 3]))
+        return inside.any(axis=1)
+    
+    def _add_table_to_doc(self, doc, table_data, spacer: bool = True):
         """
         Add a table to the Word document
+
+        With spacer, an empty paragraph follows the table; Word merges
+        tables that touch, so the next block decides whether it is needed.
         """
         if not table_data or not table_data[0]:
             return
         
         try:
-            # Clean table data
-            clean_data = []
-            for row in table_data:
-                clean_row = []
-                for cell in row:
-                    cell_text = str(cell) if cell is not None else ""
-                    clean_row.append(cell_text.strip())
-                if any(cell for cell in clean_row):  # Skip empty rows
-                    clean_data.append(clean_row)
+            # Clean table data, skipping empty rows
+            clean_data = [["" if cell is None else str(cell).strip() for cell in row]
+                          for row in table_data]
+            clean_data = [row for row in clean_data if any(row)]
             
             if not clean_data:
                 return
@@ -404,24 +486,31 @@ class ComprehensivePDFConverter:
             num_cols = max(len(row) for row in clean_data)
             
             table = doc.add_table(rows=num_rows, cols=num_cols)
-            table.style = 'Table Grid'
+            # Reference the built-in 'Table Grid' style by id, skipping the
+            # style-name lookup of the table.style setter
+            table._tbl.tblStyle_val = 'TableGrid'
             table.alignment = WD_TABLE_ALIGNMENT.LEFT
             
-            # Fill table
-            for row_idx, row_data in enumerate(clean_data):
-                for col_idx in range(num_cols):
-                    cell_text = row_data[col_idx] if col_idx < len(row_data) else ""
-                    cell = table.cell(row_idx, col_idx)
-                    cell.text = cell_text
-                    
-                    # Format header row
-                    if row_idx == 0:
-                        for paragraph in cell.paragraphs:
-                            for run in paragraph.runs:
-                                run.font.bold = True
+            # Fill table: walk the skeleton's cells in row order and add runs at
+            # the oxml level, skipping the _Cell/Paragraph/Run wrappers
+            cell_texts = (
+                (row_idx, row_data[col_idx] if col_idx < len(row_data) else "")
+                for row_idx, row_data in enumerate(clean_data)
+                for col_idx in range(num_cols)
+            )
+            for tc, (row_idx, cell_text) in zip(table._tbl.iter(qn('w:tc')), cell_texts):
+                if not cell_text:
+                    continue
+                run = tc.p_lst[0].add_r()
+                
+                # Format header row
+                if row_idx == 0:
+                    run.get_or_add_rPr().append(OxmlElement('w:b'))
+                run.text = cell_text
             
             # Add spacing after table
-            doc.add_paragraph()
+            if spacer:
+                doc.add_paragraph()
             
         except Exception as e:
             logger.warning(f"Failed to add table: {str(e)}")
@@ -431,9 +520,6 @@ class ComprehensivePDFConverter:
         Add an image to the Word document
         """
         try:
-            # Save image temporarily
-            temp_img = os.path.join(self.temp_dir, f"temp_img_{id(img_data)}.png")
-            
             # Convert bytes to image
             if isinstance(img_data, dict):
                 img_bytes = img_data.get('data', b'')
@@ -443,10 +529,6 @@ class ComprehensivePDFConverter:
                 img_bytes = img_data
                 width = height = 0
             
-            # Save image
-            with open(temp_img, 'wb') as f:
-                f.write(img_bytes)
-            
             # Add to document
             paragraph = doc.add_paragraph()
             run = paragraph.add_run()
@@ -462,7 +544,8 @@ class ComprehensivePDFConverter:
             else:
                 img_width = max_width
             
-            run.add_picture(temp_img, width=img_width)
+            # python-docx reads the image straight from memory
+            run.add_picture(io.BytesIO(img_bytes), width=img_width)
             
             # Add spacing
             doc.add_paragraph()
@@ -479,6 +562,7 @@ class ComprehensivePDFConverter:
             
             for line in lines:
                 paragraph = doc.add_paragraph()
+                previous_style = previous_rpr = None
                 
                 for span in line.get('spans', []):
                     text = span.get('text', '')
@@ -487,13 +571,21 @@ class ComprehensivePDFConverter:
                     
                     run = paragraph.add_run(text)
                     
+                    flags = span.get('flags', 0)
+                    color = span.get('color', 0)
+                    style = (span.get('font', 'Arial'), span.get('size', 11), flags & (2**4 | 2**1 | 2**2), color)
+                    
+                    # Same formatting as the previous run: copy its properties
+                    if style == previous_style:
+                        run._r.insert(0, copy.deepcopy(previous_rpr))
+                        continue
+                    
                     # Apply formatting
                     font = run.font
-                    font.name = span.get('font', 'Arial')
-                    font.size = Pt(span.get('size', 11))
+                    font.name = style[0]
+                    font.size = self._get_pt(style[1])
                     
                     # Font flags
-                    flags = span.get('flags', 0)
                     if flags & 2**4:  # Bold
                         font.bold = True
                     if flags & 2**1:  # Italic
@@ -502,14 +594,33 @@ class ComprehensivePDFConverter:
                         font.underline = True
                     
                     # Color
-                    color = span.get('color', 0)
                     if color != 0:
-                        rgb = self._int_to_rgb(color)
-                        font.color.rgb = RGBColor(*rgb)
+                        font.color.rgb = self._get_rgb_color(color)
+                    
+                    previous_style = style
+                    previous_rpr = run._r.rPr
         
         except Exception as e:
             logger.warning(f"Failed to add text block: {str(e)}")
     
+    def _get_pt(self, size: float) -> Pt:
+        """
+        Return the Pt length for a font size, building each size once
+        """
+        pt = self._pt_cache.get(size)
+        if pt is None:
+            pt = self._pt_cache[size] = Pt(size)
+        return pt
+    
+    def _get_rgb_color(self, color_int: int) -> RGBColor:
+        """
+        Return the RGBColor for an integer color, converting each color once
+        """
+        rgb_color = self._rgb_cache.get(color_int)
+        if rgb_color is None:
+            rgb_color = self._rgb_cache[color_int] = RGBColor(*self._int_to_rgb(color_int))
+        return rgb_color
+    
     def _int_to_rgb(self, color_int):
         """
         Convert integer color to RGB tuple
@@ -523,13 +634,15 @@ class ComprehensivePDFConverter:
         """
         Enhance existing DOCX with better table detection
         """
+        import pdfplumber
+        
         try:
             # Load existing document
             doc = Document(docx_path)
             
             # Extract tables using pdfplumber
             with pdfplumber.open(pdf_path) as pdf:
-                for page_num, page in enumerate(pdf.pages):
+                for page_num, page in enumerate(self._iter_plumber_pages(pdf)):
                     tables = page.extract_tables()
                     if tables:
                         logger.info(f"Found {len(tables)} tables on page {page_num + 1}")
@@ -548,36 +661,35 @@ class ComprehensivePDFConverter:
         """
         try:
             logger.info("Starting OCR conversion")
-            pdf_doc = fitz.open(pdf_path)
+            pdf_doc = self.pdf_doc
             word_doc = Document()
             
-            for page_num, page in enumerate(pdf_doc):
-                if page_num > 0:
-                    word_doc.add_page_break()
-                
-                # Convert page to image
-                mat = fitz.Matrix(2, 2)  # Increase resolution
-                pix = page.get_pixmap(matrix=mat)
-                img_data = pix.tobytes("png")
-                
-                # OCR the image
-                image = Image.open(io.BytesIO(img_data))
-                text = pytesseract.image_to_string(image)
-                
-                # Add text to document
-                if text.strip():
-                    for line in text.split('\n'):
-                        if line.strip():
-                            word_doc.add_paragraph(line)
+            # Each pytesseract call runs its own tesseract process, so threads
+            # are enough to keep several pages recognizing at once
+            concurrency = _ocr_concurrency()
+            
+            # Rendering runs ahead of the writer by at most this many pages,
+            # which bounds how many page images are held in memory
+            max_pending = concurrency + OCR_RENDER_AHEAD
+            pending = deque()
+            
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                for page in pdf_doc:
+                    # Convert page to image
+                    mat = fitz.Matrix(2, 2)  # Increase resolution
+                    pix = page.get_pixmap(matrix=mat, alpha=False)
+                    # Wrap the raw RGB samples directly, no PNG encode/decode
+                    image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+                    pending.append((page, executor.submit(self._ocr_paragraphs, image)))
+                    
+                    # Write finished pages in order while later ones are recognized
+                    if len(pending) >= max_pending:
+                        self._add_ocr_page_to_doc(word_doc, *pending.popleft())
                 
-                # Also try to extract any embedded text
-                page_text = page.get_text()
-                if page_text.strip():
-                    word_doc.add_paragraph("---")
-                    word_doc.add_paragraph(page_text)
+                while pending:
+                    self._add_ocr_page_to_doc(word_doc, *pending.popleft())
             
             word_doc.save(output_path)
-            pdf_doc.close()
             logger.info("OCR conversion completed")
             return True
             
@@ -585,6 +697,47 @@ class ComprehensivePDFConverter:
             logger.error(f"OCR conversion failed: {str(e)}")
             return False
     
+    def _ocr_paragraphs(self, image) -> List[str]:
+        """
+        OCR an image and return its paragraphs, lines joined by newlines
+
+        A single image_to_data call gives the word-level layout; words are
+        regrouped by Tesseract's own block/paragraph/line numbering.
+        """
+        import pytesseract
+        
+        data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+        
+        paragraphs: Dict[Tuple[int, int], Dict[int, List[str]]] = {}
+        for block_num, par_num, line_num, conf, word in zip(
+            data['block_num'], data['par_num'], data['line_num'], data['conf'], data['text']
+        ):
+            # Non-word rows carry a confidence of -1
+            if float(conf) < 0 or not word.strip():
+                continue
+            lines = paragraphs.setdefault((block_num, par_num), {})
+            lines.setdefault(line_num, []).append(word)
+        
+        return ['\n'.join(' '.join(words) for words in lines.values())
+                for lines in paragraphs.values()]
+    
+    def _add_ocr_page_to_doc(self, word_doc, page, ocr_future):
+        """
+        Add one OCR'd page, waiting for its recognition to finish
+        """
+        if page.number > 0:
+            word_doc.add_page_break()
+        
+        # Add text to document, one paragraph per Tesseract paragraph
+        for paragraph_text in ocr_future.result():
+            word_doc.add_paragraph(paragraph_text)
+        
+        # Also try to extract any embedded text
+        page_text = page.get_text()
+        if page_text.strip():
+            word_doc.add_paragraph("---")
+            word_doc.add_paragraph(page_text)
+    
     def _process_page_pymupdf(self, page, doc):
         """
         Process page using PyMuPDF
@@ -622,6 +775,82 @@ class ComprehensivePDFConverter:
                     doc.add_paragraph(line)
 
 
+def _ocr_concurrency() -> int:
+    """
+    Number of pages to OCR at once, from OCR_CONCURRENCY or the CPU count
+
+    An unparsable OCR_CONCURRENCY is logged and ignored rather than failing
+    the conversion.
+    """
+    default = os.cpu_count() or 1
+    value = os.environ.get("OCR_CONCURRENCY")
+    if value is None:
+        return default
+    
+    try:
+        return max(1, int(value))
+    except ValueError:
+        logger.warning(f"Ignoring invalid OCR_CONCURRENCY={value!r}, using {default}")
+        return default
+
+
+def _open_plumber(pdf_source: Union[str, bytes]):
+    """
+    Open a PDF with pdfplumber from a path or from its bytes
+    """
+    import pdfplumber
+    
+    if isinstance(pdf_source, bytes):
+        return pdfplumber.open(io.BytesIO(pdf_source))
+    return pdfplumber.open(pdf_source)
+
+
+# Methods that need the PDF and the DOCX as files on disk
+FILE_BASED_METHODS = {'pdf2docx', 'hybrid'}
+
+
+def limit_ocr_concurrency(workers: int) -> None:
+    """
+    Split the CPUs between the OCR threads of `workers` pool processes
+
+    Meant for pool initializers: each worker sets OCR_CONCURRENCY to its
+    share of the CPUs, so a batch of scanned PDFs does not start
+    cpu_count tesseract processes per worker. A value the user set is kept.
+    """
+    if "OCR_CONCURRENCY" not in os.environ:
+        os.environ["OCR_CONCURRENCY"] = str(max(1, (os.cpu_count() or 1) // workers))
+
+
+def convert_pdf_bytes(pdf_bytes: bytes, method: str = 'hybrid') -> Optional[bytes]:
+    """
+    Convert an in-memory PDF and return the DOCX bytes, or None on failure
+
+    The pymupdf and pdfplumber methods run entirely in memory. pdf2docx,
+    and so the hybrid method, only works on files, so for those the PDF is
+    written to a temporary directory and the DOCX read back from it.
+
+    Module-level so it can be submitted to a process pool.
+    """
+    if method not in FILE_BASED_METHODS:
+        output = io.BytesIO()
+        if not ComprehensivePDFConverter().convert(pdf_bytes, output, method):
+            return None
+        return output.getvalue()
+    
+    with tempfile.TemporaryDirectory() as work_dir:
+        pdf_path = os.path.join(work_dir, "input.pdf")
+        output_path = os.path.join(work_dir, "output.docx")
+        
+        with open(pdf_path, 'wb') as f:
+            f.write(pdf_bytes)
+        
+        if not ComprehensivePDFConverter().convert(pdf_path, output_path, method):
+            return None
+        
+        with open(output_path, 'rb') as f:
+            return f.read()
+
+
 def main():
     """
     Main entry point with CLI interface
@@ -6,7 +6,9 @@ Easy-to-use interface for comprehensive PDF conversion
 
 import os
 import sys
-from comprehensive_pdf_converter import ComprehensivePDFConverter
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from comprehensive_pdf_converter import ComprehensivePDFConverter, limit_ocr_concurrency
 import argparse
 
 
@@ -44,9 +46,25 @@ def convert_pdf_to_word(pdf_path, output_path=None, method='hybrid'):
     return success
 
 
-def batch_convert(folder_path, method='hybrid'):
+def _init_batch_worker(workers):
+    """
+    Tag log records with the worker process so interleaved output stays
+    readable, and give the worker its share of the CPUs for OCR
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(processName)s %(levelname)s:%(name)s:%(message)s",
+        force=True
+    )
+    limit_ocr_concurrency(workers)
+
+
+def batch_convert(folder_path, method='hybrid', workers=None):
     """
     Convert all PDFs in a folder
+
+    Documents are converted in parallel, one per worker process; workers
+    defaults to the number of CPUs.
     """
     pdf_files = [f for f in os.listdir(folder_path) if f.lower().endswith('.pdf')]
     
@@ -54,17 +72,33 @@ def batch_convert(folder_path, method='hybrid'):
         print("No PDF files found in the folder!")
         return
     
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(pdf_files)))
+    
     print(f"Found {len(pdf_files)} PDF files")
+    print(f"Workers: {workers}")
     print("-" * 50)
     
     success_count = 0
     
-    for pdf_file in pdf_files:
-        pdf_path = os.path.join(folder_path, pdf_file)
-        print(f"\nProcessing: {pdf_file}")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker, initargs=(workers,)) as executor:
+        futures = {
+            executor.submit(convert_pdf_to_word, os.path.join(folder_path, pdf_file), None, method): pdf_file
+            for pdf_file in pdf_files
+        }
         
-        if convert_pdf_to_word(pdf_path, method=method):
-            success_count += 1
+        for done, future in enumerate(as_completed(futures), 1):
+            pdf_file = futures[future]
+            try:
+                success = future.result()
+            except Exception as e:
+                print(f"\n✗ {pdf_file} failed: {e}")
+                success = False
+            
+            if success:
+                success_count += 1
+            print(f"\n[{done}/{len(pdf_files)}] Finished: {pdf_file}")
     
     print("\n" + "=" * 50)
     print(f"Batch conversion complete: {success_count}/{len(pdf_files)} successful")
@@ -88,6 +122,9 @@ Examples:
   # Batch convert folder
   python convert_pdf.py --batch /path/to/folder
   
+  # Batch convert with 4 worker processes
+  python convert_pdf.py --batch /path/to/folder --workers 4
+  
 Methods:
   hybrid     - Best quality, combines multiple methods (default)
   pdf2docx   - Fast, good for standard PDFs
@@ -104,6 +141,8 @@ Methods:
                        help='Conversion method (default: hybrid)')
     parser.add_argument('--batch', action='store_true', 
                        help='Batch convert all PDFs in folder')
+    parser.add_argument('--workers', type=int,
+                       help='Parallel worker processes for --batch (default: CPU count)')
     
     args = parser.parse_args()
     
@@ -129,7 +168,7 @@ Methods:
     # Command line mode
     if args.batch:
         if os.path.isdir(args.input):
-            batch_convert(args.input, args.method)
+            batch_convert(args.input, args.method, args.workers)
         else:
             print("Error: --batch requires a folder path")
     else:
@@ -0,0 +1,218 @@
+"""
+Shared building blocks for the PyMuPDF based converters
+
+Word XML construction, document saving and the pool worker set-up used by
+both pdfToWord and advanced_converter.
+"""
+
+import fitz  # PyMuPDF
+from docx.shared import Emu, Pt
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from lxml import etree
+from functools import lru_cache
+import re
+import zipfile
+
+
+# PyMuPDF span flag bits that map onto Word run formatting
+BOLD, ITALIC, UNDERLINE = 16, 2, 4
+STYLE_FLAGS = BOLD | ITALIC | UNDERLINE
+
+# Default "dict" extraction flags without decoding image blocks
+TEXT_ONLY_DICT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Clark-notation tags and attribute names used by the XML builders
+W_P, W_R, W_T = qn("w:p"), qn("w:r"), qn("w:t")
+W_TAB, W_BR, XML_SPACE = qn("w:tab"), qn("w:br"), qn("xml:space")
+W_TR, W_TC, W_TC_PR, W_TC_W = qn("w:tr"), qn("w:tc"), qn("w:tcPr"), qn("w:tcW")
+W_TYPE, W_W, W_VAL = qn("w:type"), qn("w:w"), qn("w:val")
+W_TBL_PR, W_TBL_STYLE, W_TBL_W, W_JC = qn("w:tblPr"), qn("w:tblStyle"), qn("w:tblW"), qn("w:jc")
+W_TBL_LOOK, W_TBL_GRID, W_GRID_COL = qn("w:tblLook"), qn("w:tblGrid"), qn("w:gridCol")
+W_P_PR, W_P_STYLE = qn("w:pPr"), qn("w:pStyle")
+W_R_PR, W_R_FONTS, W_ASCII, W_H_ANSI = qn("w:rPr"), qn("w:rFonts"), qn("w:ascii"), qn("w:hAnsi")
+W_B, W_I, W_U, W_SZ = qn("w:b"), qn("w:i"), qn("w:u"), qn("w:sz")
+
+# <w:tblLook> attributes add_table() writes for the 'Table Grid' style
+TBL_LOOK_ATTRS = {
+    qn("w:firstColumn"): "1", qn("w:firstRow"): "1", qn("w:lastColumn"): "0",
+    qn("w:lastRow"): "0", qn("w:noHBand"): "0", qn("w:noVBand"): "1", W_VAL: "04A0",
+}
+
+
+def open_pdf(pdf_source):
+    """
+    Open a PDF given either as a path or as its raw bytes
+    """
+    if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=pdf_source, filetype="pdf")
+    return fitz.open(pdf_source)
+
+
+# PDF opened once per pool worker by open_worker_document
+_worker_document = None
+
+
+def open_worker_document(pdf_source):
+    """
+    Pool initializer: open the PDF once for the lifetime of the worker
+    """
+    global _worker_document
+    _worker_document = open_pdf(pdf_source)
+
+
+def extract_worker_page(extract_page, page_num):
+    """
+    Run extract_page on a page of the worker's already opened PDF
+
+    extract_page must be a module-level function taking the page, so that
+    it can be sent to the pool.
+    """
+    return extract_page(_worker_document[page_num])
+
+
+def save_docx(doc, output_path, compresslevel=3):
+    """
+    Save a Document like doc.save(), but with a faster deflate level
+
+    Parts are written to the zip one at a time, in the same layout
+    python-docx produces, with XML parts serialized straight into their
+    zip entries. Level 3 is noticeably faster than zipfile's default of 6
+    for a slightly larger file.
+    """
+    # The content-types writer is private to python-docx; if a release has
+    # moved it, save the stock way instead
+    try:
+        from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+        from docx.opc.part import XmlPart
+        from docx.opc.pkgwriter import _ContentTypesItem
+        
+        package = doc.part.package
+        parts = list(package.iter_parts())
+        for part in parts:
+            part.before_marshal()
+        content_types = _ContentTypesItem.from_parts(parts).blob
+    except (ImportError, AttributeError):
+        doc.save(output_path)
+        return
+    
+    with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as zf:
+        zf.writestr(CONTENT_TYPES_URI.membername, content_types)
+        zf.writestr(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+        
+        for part in parts:
+            if isinstance(part, XmlPart):
+                with zf.open(part.partname.membername, "w") as part_file:
+                    etree.ElementTree(part.element).write(part_file, encoding="UTF-8", standalone=True)
+            else:
+                zf.writestr(part.partname.membername, part.blob)
+            if len(part.rels):
+                zf.writestr(part.partname.rels_uri.membername, part.rels.xml)
+
+
+def build_table_xml(doc, rows, cols, bold_header=False, alignment=None):
+    """
+    Build a 'Table Grid' <w:tbl> with all cell text in a single lxml tree
+
+    Mirrors what doc.add_table() plus per-cell text assignment produce,
+    without creating python-docx _Cell objects. Every row must hold
+    exactly `cols` strings; alignment, if given, is a <w:jc> value such
+    as "left".
+    """
+    # Equal column widths across the text block, as add_table() does
+    section = doc.sections[-1]
+    block_width = section.page_width - section.left_margin - section.right_margin
+    col_width = str(Emu(block_width // cols).twips)
+    
+    tbl = OxmlElement("w:tbl")
+    
+    tbl_pr = etree.SubElement(tbl, W_TBL_PR)
+    etree.SubElement(tbl_pr, W_TBL_STYLE, {W_VAL: "TableGrid"})
+    etree.SubElement(tbl_pr, W_TBL_W, {W_TYPE: "auto", W_W: "0"})
+    if alignment:
+        etree.SubElement(tbl_pr, W_JC, {W_VAL: alignment})
+    etree.SubElement(tbl_pr, W_TBL_LOOK, TBL_LOOK_ATTRS)
+    
+    tbl_grid = etree.SubElement(tbl, W_TBL_GRID)
+    for _ in range(cols):
+        etree.SubElement(tbl_grid, W_GRID_COL, {W_W: col_width})
+    
+    for row_idx, row in enumerate(rows):
+        tr = etree.SubElement(tbl, W_TR)
+        
+        for cell_text in row:
+            tc = etree.SubElement(tr, W_TC)
+            tc_pr = etree.SubElement(tc, W_TC_PR)
+            etree.SubElement(tc_pr, W_TC_W, {W_TYPE: "dxa", W_W: col_width})
+            paragraph = etree.SubElement(tc, W_P)
+            
+            if cell_text:
+                run = etree.SubElement(paragraph, W_R)
+                if bold_header and row_idx == 0:
+                    rpr = etree.SubElement(run, W_R_PR)
+                    etree.SubElement(rpr, W_B)
+                append_run_text(run, cell_text)
+    
+    return tbl
+
+
+# Characters python-docx turns into <w:tab/> and <w:br/> instead of text
+_RUN_SPECIAL_CHARS = re.compile(r"([\t\r\n])")
+
+
+def append_run_text(run, text):
+    """
+    Add text to a <w:r>, translating tabs and line breaks as python-docx does
+    """
+    for chunk in _RUN_SPECIAL_CHARS.split(text):
+        if chunk == "\t":
+            etree.SubElement(run, W_TAB)
+        elif chunk == "\r" or chunk == "\n":
+            etree.SubElement(run, W_BR)
+        elif chunk:
+            text_element = etree.SubElement(run, W_T)
+            text_element.text = chunk
+            if chunk[0].isspace() or chunk[-1].isspace():
+                text_element.set(XML_SPACE, "preserve")
+
+
+@lru_cache(maxsize=512)
+def build_rpr(font_name, size, style_flags):
+    """
+    Build the run properties for a span style, once per distinct style
+
+    style_flags holds only the STYLE_FLAGS bits of the span's flags.
+    Callers must deep-copy the result before inserting it into a document.
+    """
+    # Children follow the element order the schema requires
+    rpr = OxmlElement("w:rPr")
+    etree.SubElement(rpr, W_R_FONTS, {W_ASCII: font_name, W_H_ANSI: font_name})
+    
+    # Handle font flags
+    if style_flags & BOLD:
+        etree.SubElement(rpr, W_B)
+    if style_flags & ITALIC:
+        etree.SubElement(rpr, W_I)
+    
+    # Half-points, as python-docx writes them
+    etree.SubElement(rpr, W_SZ, {W_VAL: str(int(Pt(size).pt * 2))})
+    
+    if style_flags & UNDERLINE:
+        etree.SubElement(rpr, W_U, {W_VAL: "single"})
+    return rpr
+
+
+def append_to_body(body, *elements):
+    """
+    Append prebuilt block-level elements, keeping sectPr last in the body
+
+    The elements are moved, so the children of a page fragment can be
+    passed as append_to_body(body, *fragment).
+    """
+    sect_pr = body.sectPr
+    if sect_pr is None:
+        body.extend(elements)
+    else:
+        for element in elements:
+            sect_pr.addprevious(element)
+
@@ -1,182 +1,356 @@
-import fitz  # PyMuPDF
 from docx import Document
-from docx.shared import Inches, Pt
+from docx.shared import Inches
+from docx.oxml import OxmlElement
+from lxml import etree
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import copy
+import io
 import os
+import numpy as np
+from converter_common import (
+    BOLD, STYLE_FLAGS, TEXT_ONLY_DICT_FLAGS, W_P, W_R, W_BR, W_TYPE, W_VAL, W_P_PR, W_P_STYLE,
+    append_run_text, append_to_body, build_rpr, build_table_xml, extract_worker_page, open_pdf,
+    open_worker_document, save_docx,
+)
 
 
-def pdf_to_word(pdf_path, output_path):
+# Pages allowed to queue for the writer beyond the running workers
+EXTRACT_AHEAD = 4
+
+# Vertical gap, relative to the previous line's height, that starts a new paragraph
+PARAGRAPH_GAP_RATIO = 0.3
+
+# How far, relative to the previous line's height, a wrapped line may start
+# from the previous line's left edge; leaves room for first-line indents
+WRAP_INDENT_RATIO = 3.0
+
+
+def pdf_to_word(pdf_path, output_path, workers=None, preserve_formatting=True):
     """
     Convert PDF to Word document with improved formatting and table detection
+
+    Pages are extracted in a process pool (up to 8 workers by default) and
+    the Word document is assembled in order in this process, at most
+    EXTRACT_AHEAD pages behind the workers.
+
+    With preserve_formatting=False each page becomes a single paragraph of
+    its plain text: no tables, images, fonts or headings, but extraction
+    is many times faster and runs in this process.
     """
+    if workers is None:
+        workers = min(os.cpu_count() or 1, 8)
+    
     # Open PDF
-    pdf_document = fitz.open(pdf_path)
+    pdf_document = open_pdf(pdf_path)
+    page_count = pdf_document.page_count
     
     # Create new Word document
     doc = Document()
     
-    # Process each page
-    for page_num in range(pdf_document.page_count):
-        page = pdf_document[page_num]
-        
-        # Add page break for pages after the first
-        if page_num > 0:
-            doc.add_page_break()
-        
-        # Try to find tables first
-        tables = page.find_tables()
-        table_areas = []
-        
-        # Process tables
-        for table in tables:
-            table_areas.append(table.bbox)
-            process_table(doc, table)
-        
-        # Extract text blocks with formatting
-        blocks = page.get_text("dict")
-        
-        # Group blocks by y-coordinate for better layout
-        sorted_blocks = sorted(blocks["blocks"], key=lambda b: b.get("bbox", [0, 0, 0, 0])[1])
+    # Each distinct image xref is extracted once, however many pages repeat it
+    @lru_cache(maxsize=256)
+    def get_image(xref):
+        return pdf_document.extract_image(xref)["image"]
+    
+    # Plain text extraction is too cheap to be worth a process pool
+    if preserve_formatting and workers > 1 and page_count > 1:
+        # Extraction runs ahead of the writer by at most this many pages,
+        # which bounds how many payloads are held in memory
+        max_pending = workers + EXTRACT_AHEAD
+        pending = deque()
         
-        for block in sorted_blocks:
-            # Skip text that's already in tables
-            if is_in_table_area(block, table_areas):
-                continue
+        with ProcessPoolExecutor(workers, initializer=open_worker_document, initargs=(pdf_path,)) as executor:
+            for page_num in range(page_count):
+                pending.append((page_num, executor.submit(extract_worker_page, extract_page_payload, page_num)))
                 
-            if "lines" in block:  # Text block
-                process_text_block(doc, block)
-            elif "image" in block:  # Image block
-                process_image_block(doc, block, page)
+                # Write finished pages in order while later ones are extracted
+                if len(pending) >= max_pending:
+                    done_num, future = pending.popleft()
+                    add_page_payload(doc, done_num, future.result(), get_image)
+            
+            while pending:
+                done_num, future = pending.popleft()
+                add_page_payload(doc, done_num, future.result(), get_image)
+    else:
+        for page_num in range(page_count):
+            add_page_payload(doc, page_num, extract_page_payload(pdf_document[page_num], preserve_formatting), get_image)
     
     # Save the document
-    doc.save(output_path)
+    save_docx(doc, output_path)
     pdf_document.close()
     print(f"Conversion completed: {output_path}")
 
 
-def process_table(doc, table):
+def extract_page_payload(page, preserve_formatting=True):
+    """
+    Extract everything needed to write one page as picklable data
+
+    Returns the cell data of every table and the page's blocks sorted by
+    their top edge, without those that overlap a table. Image blocks with
+    an xref carry it in place of their bytes; inline images keep theirs.
+    Without preserve_formatting, only the page's plain text is returned.
+    """
+    if not preserve_formatting:
+        # Plain text skips table detection and the per-span dicts
+        return {"text": page.get_text("text")}
+    
+    # Try to find tables first
+    tables = page.find_tables()
+    table_areas = [table.bbox for table in tables]
+    
+    # Image placements, with the xref each one draws
+    image_infos = page.get_image_info(xrefs=True)
+    
+    if all(info["xref"] for info in image_infos):
+        # Extract text blocks with formatting, leaving the image bytes out;
+        # images are placed from their xrefs and extracted by the writer
+        blocks = page.get_text("dict", flags=TEXT_ONLY_DICT_FLAGS)
+        blocks["blocks"].extend(
+            {"type": 1, "number": info["number"], "bbox": info["bbox"], "xref": info["xref"]}
+            for info in image_infos
+        )
+    else:
+        # Inline images have no xref, so only the full dict extraction
+        # delivers their bytes; ship xrefs instead of bytes where possible
+        blocks = page.get_text("dict")
+        xrefs = {info["number"]: info["xref"] for info in image_infos}
+        for block in blocks["blocks"]:
+            if "image" in block and xrefs.get(block["number"]):
+                block["xref"] = xrefs[block["number"]]
+                del block["image"]
+    
+    # Drop text blocks without visible text, common around margins and footers
+    page_blocks = [block for block in blocks["blocks"] if "lines" not in block or _has_visible_text(block)]
+    
+    # Group blocks by y-coordinate for better layout, sorting in place
+    page_blocks.sort(key=lambda b: b.get("bbox", (0, 0, 0, 0))[1])
+    
+    return {
+        "tables": [table.extract() for table in tables],
+        # Skip text that's already in tables
+        "blocks": blocks_outside_tables(page_blocks, table_areas),
+    }
+
+
+def _has_visible_text(block):
+    """
+    Check whether any span of a text block holds non-whitespace text
+    """
+    return any(span["text"].strip() for line in block["lines"] for span in line["spans"])
+
+
+def add_page_payload(doc, page_num, payload, get_image):
     """
-    Extract and format tables
+    Write one extracted page to the Word document
+
+    The page is built as a detached <w:body> fragment and spliced into the
+    document in one step. get_image returns the image bytes for an xref.
+    """
+    page_body = OxmlElement("w:body")
+    
+    # Add page break for pages after the first
+    if page_num > 0:
+        page_body.append(_page_break_xml())
+    
+    if "text" in payload:
+        # Plain text page, lines kept as line breaks
+        text = payload["text"].rstrip("\n")
+        paragraph = etree.SubElement(page_body, W_P)
+        if text.strip():
+            append_run_text(etree.SubElement(paragraph, W_R), text)
+        append_to_body(doc.element.body, *page_body)
+        return
+    
+    # Process tables
+    for table_data in payload["tables"]:
+        process_table(doc, page_body, table_data)
+    
+    for block in payload["blocks"]:
+        if "lines" in block:  # Text block
+            page_body.extend(build_block_xml(block))
+        elif "xref" in block or "image" in block:  # Image block
+            process_image_block(doc, page_body, block, get_image)
+    
+    append_to_body(doc.element.body, *page_body)
+
+
+def process_table(doc, page_body, table_data):
+    """
+    Format extracted table cells as a Word table
+
+    The <w:tbl> is built in one lxml pass rather than through python-docx's
+    per-cell API.
     """
     try:
-        # Extract table data
-        table_data = table.extract()
-        
         if not table_data:
             return
         
-        # Create Word table
-        word_table = doc.add_table(rows=len(table_data), cols=len(table_data[0]))
-        word_table.style = 'Table Grid'
+        # Stringify and strip every cell, padding rows to the first row's width
+        cols = len(table_data[0])
+        rows = [[str(cell_text).strip() if cell_text else "" for cell_text in row[:cols]] for row in table_data]
+        for cells in rows:
+            cells.extend([""] * (cols - len(cells)))
         
-        # Fill table data
-        for row_idx, row in enumerate(table_data):
-            for col_idx, cell_text in enumerate(row):
-                if cell_text:
-                    cell = word_table.cell(row_idx, col_idx)
-                    cell.text = str(cell_text).strip()
+        # Create Word table
+        page_body.append(build_table_xml(doc, rows, cols))
         
         # Add spacing after table
-        doc.add_paragraph("")
+        etree.SubElement(page_body, W_P)
         
     except Exception as e:
         print(f"Error processing table: {e}")
 
 
-def is_in_table_area(block, table_areas):
+def _page_break_xml():
     """
-    Check if a text block is within any table area
+    Build the paragraph doc.add_page_break() would add
     """
-    if not table_areas or "bbox" not in block:
-        return False
+    paragraph = OxmlElement("w:p")
+    run = etree.SubElement(paragraph, W_R)
+    etree.SubElement(run, W_BR, {W_TYPE: "page"})
+    return paragraph
+
+
+def blocks_outside_tables(blocks, table_areas):
+    """
+    Return the blocks that do not overlap any table area
+
+    All block/table pairs are compared in one NumPy broadcast.
+    """
+    if not table_areas or not blocks:
+        return blocks
     
-    block_bbox = block["bbox"]
+    block_boxes = np.array([block.get("bbox", (0, 0, 0, 0)) for block in blocks], dtype=np.float64)
+    table_boxes = np.array(table_areas, dtype=np.float64)
     
-    for table_bbox in table_areas:
-        # Check if block overlaps with table area
-        if (block_bbox[0] < table_bbox[2] and block_bbox[2] > table_bbox[0] and
-            block_bbox[1] < table_bbox[3] and block_bbox[3] > table_bbox[1]):
-            return True
+    # (blocks, tables) overlap matrix
+    overlaps = ((block_boxes[:, None, 0] < table_boxes[None, :, 2]) & (block_boxes[:, None, 2] > table_boxes[None, :, 0]) &
+                (block_boxes[:, None, 1] < table_boxes[None, :, 3]) & (block_boxes[:, None, 3] > table_boxes[None, :, 1]))
     
-    return False
+    return [block for block, overlapping in zip(blocks, overlaps.any(axis=1)) if not overlapping]
 
 
-def process_text_block(doc, block):
+def build_block_xml(block):
     """
-    Process text blocks with improved formatting and spacing
+    Build the <w:p> elements for a text block with improved formatting
+
+    Lines that start below the previous one, by less than PARAGRAPH_GAP_RATIO
+    of its height, and that overlap it horizontally with a left edge within
+    WRAP_INDENT_RATIO of its height are soft wraps and continue the same
+    paragraph.
     """
-    # Group lines by similar y-coordinates to detect paragraphs
-    lines = block.get("lines", [])
-    if not lines:
-        return
+    paragraphs = []
+    previous_bbox = None
+    # (text, font name, size, style flags) per run of the current paragraph
+    runs = []
+    paragraph_text = ""
+    is_heading = False
     
-    # Process each line
-    for line_idx, line in enumerate(lines):
-        # Create paragraph for each line
-        paragraph = doc.add_paragraph()
+    for line in block.get("lines", []):
+        bbox = line["bbox"]
+        
+        # Group lines by their vertical gap to detect paragraphs; a wrapped
+        # line starts below the previous one, never beside it, and in the
+        # same column, so aligned grid rows are not joined
+        if previous_bbox is None:
+            is_wrap = False
+        else:
+            line_height = previous_bbox[3] - previous_bbox[1]
+            is_wrap = (bbox[1] > previous_bbox[1] and
+                       bbox[1] - previous_bbox[3] < PARAGRAPH_GAP_RATIO * line_height and
+                       bbox[0] < previous_bbox[2] and bbox[2] > previous_bbox[0] and
+                       abs(bbox[0] - previous_bbox[0]) < WRAP_INDENT_RATIO * line_height)
+        if not is_wrap:
+            if previous_bbox is not None:
+                paragraphs.append(_flush_paragraph(runs, paragraph_text, is_heading))
+            runs = []
+            paragraph_text = ""
+            is_heading = False
+        previous_bbox = bbox
         
-        # Check if this looks like a heading (larger font, bold)
-        is_heading = False
-        line_text = ""
+        # Only the first visible span of a line may need a separator
+        line_start = True
         
         for span in line["spans"]:
             text = span["text"]
-            line_text += text
+            if not text.strip():
+                continue
             
-            if text.strip():
-                run = paragraph.add_run(text)
-                
-                # Apply formatting
-                font = run.font
-                font.name = span.get("font", "Arial")
-                font_size = span.get("size", 12)
-                font.size = Pt(font_size)
-                
-                # Check for heading characteristics
-                if font_size > 14:
-                    is_heading = True
-                
-                # Handle font flags
-                flags = span.get("flags", 0)
-                if flags & 2**4:  # Bold
-                    font.bold = True
-                    is_heading = True
-                if flags & 2**1:  # Italic
-                    font.italic = True
-                if flags & 2**2:  # Underline
-                    font.underline = True
-        
-        # Apply heading style if detected
-        if is_heading and line_text.strip():
-            if len(line_text.strip()) < 100:  # Likely a heading
-                paragraph.style = 'Heading 2'
-        
-        # Add extra spacing for paragraphs
-        if line_idx == len(lines) - 1:  # Last line of block
-            doc.add_paragraph("")
+            # Join wrapped lines with a space
+            if line_start and paragraph_text and not paragraph_text[-1].isspace() and not text[0].isspace():
+                text = " " + text
+            line_start = False
+            paragraph_text += text
+            
+            font_name, font_size, flags = span.get("font", "Arial"), span.get("size", 12), span.get("flags", 0)
+            style_flags = flags & STYLE_FLAGS
+            
+            # Sizes are rounded to the half-points Word stores anyway
+            runs.append((text, font_name, round(font_size * 2) / 2, style_flags))
+            
+            # Check if this looks like a heading (larger font, bold)
+            if font_size > 14 or style_flags & BOLD:
+                is_heading = True
+    
+    if previous_bbox is not None:
+        paragraphs.append(_flush_paragraph(runs, paragraph_text, is_heading))
+    
+    return paragraphs
+
+
+def _flush_paragraph(runs, paragraph_text, is_heading):
+    """
+    Build one <w:p> from the runs accumulated for a visual paragraph
+
+    The paragraph is cloned from a cached skeleton for its heading style
+    and run formats, so only the text is added per paragraph.
+    """
+    # Apply heading style if detected
+    heading = is_heading and 0 < len(paragraph_text.strip()) < 100  # Likely a heading
+    
+    paragraph = copy.deepcopy(_paragraph_skeleton(heading, tuple(run[1:] for run in runs)))
+    for run, (text, _, _, _) in zip(paragraph.iterchildren(W_R), runs):
+        append_run_text(run, text)
+    
+    return paragraph
 
 
-def process_image_block(doc, block, page):
+@lru_cache(maxsize=1024)
+def _paragraph_skeleton(heading, run_formats):
     """
-    Extract and add images to Word document
+    Build a <w:p> with formatted but empty runs, once per paragraph layout
+
+    run_formats holds a (font name, size, style flags) tuple per run.
+    Callers must deep-copy the result before inserting it into a document.
+    """
+    paragraph = OxmlElement("w:p")
+    
+    if heading:
+        p_pr = etree.SubElement(paragraph, W_P_PR)
+        etree.SubElement(p_pr, W_P_STYLE, {W_VAL: "Heading2"})
+    
+    for font_name, size, style_flags in run_formats:
+        # Apply formatting from a shared rPr template
+        run = etree.SubElement(paragraph, W_R)
+        run.append(copy.deepcopy(build_rpr(font_name, size, style_flags)))
+    
+    return paragraph
+
+
+def process_image_block(doc, page_body, block, get_image):
+    """
+    Add an image block's picture to the page
     """
     try:
-        # Get image data
-        img_index = block["image"]
-        base_image = page.parent.extract_image(img_index)
-        image_bytes = base_image["image"]
-        
-        # Save temporary image
-        temp_img_path = f"temp_image_{img_index}.png"
-        with open(temp_img_path, "wb") as img_file:
-            img_file.write(image_bytes)
-        
-        # Add image to document
-        paragraph = doc.add_paragraph()
-        run = paragraph.add_run()
-        run.add_picture(temp_img_path, width=Inches(6))
+        # Inline images have no xref and carry their own bytes
+        image_bytes = get_image(block["xref"]) if "xref" in block else block["image"]
         
-        # Clean up temporary file
-        os.remove(temp_img_path)
+        # Add image to document straight from memory
+        inline = doc.part.new_pic_inline(io.BytesIO(image_bytes), Inches(6), None)
+        paragraph = etree.SubElement(page_body, W_P)
+        etree.SubElement(paragraph, W_R).add_drawing(inline)
         
     except Exception as e:
         print(f"Error processing image: {e}")